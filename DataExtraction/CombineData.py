@@ -2,22 +2,33 @@ import pandas as pd
 import os
 
 
-def merge_csvs_on_time(output_file="merged.csv"):
+def read_timeseries_csv(path):
+    """
+    Read a CSV and index it by its 'time_berlin' column.
+
+    The timestamps are always written as "%Y-%m-%d %H:%M:%S", so they are parsed
+    with that explicit format instead of letting read_csv infer it.
+    """
+    # Read the timestamps as strings, otherwise pyarrow infers them and the format is never used
+    df = pd.read_csv(path, engine="pyarrow", dtype_backend="pyarrow", dtype={"time_berlin": "string"})
+    df["time_berlin"] = pd.to_datetime(df["time_berlin"], format="%Y-%m-%d %H:%M:%S", cache=True)
+    return df.set_index("time_berlin")
+
+
+def merge_csvs_on_time(output_file="merged.parquet"):
     """
     Merge CSVs from 'smard_data' and 'weather_data' on 'time_berlin'.
-    Only retain rows where both datasets have data, dropping any with NaN.
+    Only retain timestamps present in both datasets, dropping any rows with NaN.
 
     Parameters
     ----------
     output_file : str
-        Path to save the merged CSV
+        Path to save the merged data as zstd-compressed Parquet
     """
 
     # --- Set Folders where CSVs are located ---
     smard_folder = "smard_data"
-    os.makedirs(smard_folder, exist_ok=True)
     weather_folder = "weather_data"
-    os.makedirs(weather_folder, exist_ok=True)
     # --- Read CSVs ---
     smard_file = os.path.join(smard_folder, "combined_smard_data.csv")
     weather_data = os.path.join(weather_folder, "weather_avg_data.csv")
@@ -28,22 +39,23 @@ def merge_csvs_on_time(output_file="merged.csv"):
         raise FileNotFoundError(f"No CSV files found in {weather_folder}")
 
     # Assume one file per folder (A1.csv, B1.csv)
-    df_smard = pd.read_csv(smard_file, parse_dates=["time_berlin"])
-    df_weather = pd.read_csv(weather_data, parse_dates=["time_berlin"])
-
-    # --- Merge on time ---
-    merged = pd.merge(
-        df_smard, df_weather,
-        on="time_berlin",
-        how="outer",  # keep all timestamps
-        sort=True  # sort by time
-    )
-
-    # Drop any row with NaN in any column
+    df_smard = read_timeseries_csv(smard_file)
+    df_weather = read_timeseries_csv(weather_data)
+
+    # --- Join on time ---
+    # Inner join keeps only timestamps present in both datasets. SMARD repeats the
+    # hour at the DST fall-back, so only the weather side has to be unique.
+    merged = df_smard.join(
+        df_weather,
+        how="inner",
+        validate="many_to_one"
+    ).sort_index()
+
+    # Drop rows where either source has a missing value
     merged_clean = merged.dropna()
 
     # Save
-    merged_clean.to_csv(output_file, index=False)
+    merged_clean.to_parquet(output_file, compression="zstd")
     print(f"Merged {smard_file} and {weather_data} to {output_file}")
 
 
@@ -1,69 +1,116 @@
-import requests
+import asyncio
+import aiohttp
 import pandas as pd
 import numpy as np
 import os
-import time
+from HttpCache import read_cache, write_cache
 
+# Open-Meteo hourly variables and the column names they are saved under
+WEATHER_VARIABLES = {
+    "temperature_2m": "temperature_2m_°C",
+    "wind_speed_100m": "wind_speed_100m_km/h",
+    "shortwave_radiation": "shortwave_radiation_W/m²",
+}
 
 # --- Step 2: Create grid points (2° steps) ---
 def get_grid_points(lat_min, lat_max, lon_min, lon_max):
-    lat_points = np.arange(lat_min, lat_max, 2.0)
-    lon_points = np.arange(lon_min, lon_max, 2.0)
-    grid_points = [(lat, lon) for lat in lat_points for lon in lon_points]
+    lat_grid, lon_grid = np.meshgrid(
+        np.arange(lat_min, lat_max, 2.0),
+        np.arange(lon_min, lon_max, 2.0),
+        indexing="ij"
+    )
+    # (N, 2) array of (lat, lon) rows, in the same order as the nested lat/lon loop
+    grid_points = np.stack([lat_grid.ravel(), lon_grid.ravel()], axis=1)
     return grid_points
 
 # --- Step 3: define Function to fetch data from Open-Meteo ---
-def fetch_point_data(lat, lon, start_date, end_date):
+async def fetch_point_data(session, lat, lon, start_date, end_date):
     url = "https://archive-api.open-meteo.com/v1/archive"
     params = {
         "latitude": lat,
         "longitude": lon,
         "start_date": start_date,
         "end_date": end_date,
-        "hourly": "temperature_2m,wind_speed_100m,shortwave_radiation",
+        "hourly": ",".join(WEATHER_VARIABLES),
         "timezone": "Europe/Berlin",
     }
-    r = requests.get(url, params=params)
-    r.raise_for_status()
-    data = r.json()
-    df = pd.DataFrame(data["hourly"])
-    df["time"] = pd.to_datetime(df["time"])
-    return df.set_index("time")
-
-# --- Step 4: Loop over grid points & aggregate ---
-def fetch_germany_average(grid_points, start_date, end_date, retries: int = 3, wait: int = 10):
-    dfs = []
-    for lat, lon in grid_points:
-        for attempt in range(retries):
+    cached = read_cache(url, params)
+    if cached is not None:
+        return cached
+
+    async with session.get(url, params=params) as r:
+        r.raise_for_status()
+        data = await r.json()
+    hourly = data["hourly"]
+    # Non-empty archive data without gaps will not change anymore, so keep it for good
+    final = all(hourly[var] and all(v is not None for v in hourly[var]) for var in WEATHER_VARIABLES)
+    write_cache(url, hourly, params, final=final)
+    return hourly
+
+async def fetch_point_with_retries(session, semaphore, lat, lon, start_date, end_date, retries, wait):
+    for attempt in range(retries):
+        try:
+            # Only hold a slot while the request is in flight, not while waiting to retry
+            async with semaphore:
+                hourly = await fetch_point_data(session, lat, lon, start_date, end_date)
+            print(f"Successfully fetched data for: {lat}, {lon}")
+            return hourly
+        except Exception as e:
+            if attempt < retries - 1:
+                print(f"Retry {attempt + 1}/{retries} for {lat},{lon} after error: {e}")
+                await asyncio.sleep(wait)
+            else:
+                print(f"Failed at {lat},{lon} after {retries} retries: {e}")
+                raise
+
+# --- Step 4: Fetch all grid points concurrently & aggregate ---
+async def fetch_germany_average(grid_points, start_date, end_date, retries: int = 3, wait: int = 10,
+                                max_concurrency: int = 8):
+    semaphore = asyncio.Semaphore(max_concurrency)
+    async with aiohttp.ClientSession() as session:
+        tasks = [
+            fetch_point_with_retries(session, semaphore, lat, lon, start_date, end_date, retries, wait)
+            for lat, lon in grid_points.tolist()
+        ]
+
+        # Accumulate running sums per variable as points arrive instead of keeping every
+        # point's data around. Counts are per hour so missing values are skipped like pandas' mean.
+        sums = {var: None for var in WEATHER_VARIABLES}
+        counts = {var: None for var in WEATHER_VARIABLES}
+        first_index = None
+        for next_point in asyncio.as_completed(tasks):
             try:
-                df = fetch_point_data(lat, lon, start_date, end_date)
-                dfs.append(df)
-                print(f"Successfully fetched data for: {lat}, {lon}")
-                break
-            except Exception as e:
-                if attempt < retries - 1:
-                    print(f"Retry {attempt + 1}/{retries} for {lat},{lon} after error: {e}")
-                    time.sleep(wait)
-                else:
-                    print(f"Failed at {lat},{lon} after {retries} retries: {e}")
-
-    if not dfs:
+                hourly = await next_point
+            except Exception:
+                continue  # already reported by fetch_point_with_retries
+
+            if first_index is None:
+                first_index = pd.to_datetime(hourly["time"])
+            for var in WEATHER_VARIABLES:
+                col = np.asarray(hourly[var], dtype=np.float64)  # None becomes NaN
+                valid = ~np.isnan(col)
+                if sums[var] is None:
+                    sums[var] = np.zeros_like(col)
+                    counts[var] = np.zeros(col.shape, dtype=np.int64)
+                sums[var] += np.where(valid, col, 0.0)
+                counts[var] += valid
+
+    if first_index is None:
         raise RuntimeError("No dataframes could be fetched for any grid point.")
 
-    # Combine all dataframes
-    combined = pd.concat(dfs, axis=1, keys=[f"{lat},{lon}" for lat, lon in grid_points])
-    # Average across grid points for each variable
+    # All points share the same hourly index; hours without any value stay NaN
     avg_df = pd.DataFrame({
-        "temperature_2m_°C": combined.xs("temperature_2m", axis=1, level=1).mean(axis=1), # returns series with datetime as index
-        "wind_speed_100m_km/h": combined.xs("wind_speed_100m", axis=1, level=1).mean(axis=1),
-        "shortwave_radiation_W/m²": combined.xs("shortwave_radiation", axis=1, level=1).mean(axis=1),
-    })
+        column: np.divide(sums[var], counts[var], out=np.full_like(sums[var], np.nan), where=counts[var] > 0)
+        for var, column in WEATHER_VARIABLES.items()
+    }, index=first_index)
     avg_df.index.name = 'time_berlin'
     return avg_df
 
 def run(lat_min, lat_max, lon_min, lon_max, start_date, end_date):
     grid_points = get_grid_points(lat_min, lat_max, lon_min, lon_max)
-    df_germany_average = fetch_germany_average(grid_points, start_date, end_date)
+    df_germany_average = asyncio.run(fetch_germany_average(grid_points, start_date, end_date))
+    # float32 is plenty for temperature, wind speed and radiation and halves the data size
+    df_germany_average = df_germany_average.astype("float32")
 
     folder_name = "weather_data"
     os.makedirs(folder_name, exist_ok=True)
@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+import time
+
+CACHE_FOLDER = "http_cache"
+
+
+def get_cache_file(url: str, params: dict | None = None) -> str:
+    """
+    Build the cache file path for a request from its URL and query parameters.
+    """
+    key = json.dumps([url, sorted((params or {}).items())], default=str)
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_FOLDER, f"{digest}.json")
+
+
+def read_cache(url: str, params: dict | None = None, expire_after: int = 3600):
+    """
+    Load a cached JSON response.
+
+    Args:
+        url (str): Request URL.
+        params (dict): Optional query parameters that are part of the cache key.
+        expire_after (int): Age in seconds after which a non-final entry is ignored.
+
+    Returns:
+        The cached JSON data, or None if there is no usable entry.
+    """
+    cache_file = get_cache_file(url, params)
+    if not os.path.exists(cache_file):
+        return None
+
+    with open(cache_file, encoding="utf-8") as f:
+        entry = json.load(f)
+
+    # Final entries hold data that can no longer change (e.g. a completed week)
+    if not entry["final"] and time.time() - entry["saved_at"] > expire_after:
+        return None
+    return entry["data"]
+
+
+def write_cache(url: str, data, params: dict | None = None, final: bool = False):
+    """
+    Save a JSON response to the cache.
+
+    Args:
+        url (str): Request URL.
+        data: JSON-serializable response data.
+        params (dict): Optional query parameters that are part of the cache key.
+        final (bool): Whether the data is complete and should never expire.
+    """
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+    cache_file = get_cache_file(url, params)
+
+    # Write to a temporary file first so concurrent downloads never see half-written entries
+    tmp_file = f"{cache_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump({"saved_at": time.time(), "final": final, "data": data}, f)
+    os.replace(tmp_file, cache_file)
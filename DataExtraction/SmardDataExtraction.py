@@ -1,9 +1,13 @@
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
-import requests
+import csv
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import aiohttp
 import pandas as pd
 import os
 import glob
+from HttpCache import read_cache, write_cache
 
 def get_utc_timestamp_from_date(year: int, month: int, day: int) -> int:
 
@@ -20,21 +24,37 @@ def get_utc_timestamp_from_date(year: int, month: int, day: int) -> int:
 
 
 
-def find_latest_smard_daily_dataset(start_timestamp: int, max_days_back: int = 14):
+async def smard_dataset_exists(session: aiohttp.ClientSession, url: str) -> bool:
+    """
+    Check whether a SMARD dataset exists without downloading its JSON body.
+    """
+    timeout = aiohttp.ClientTimeout(total=10)
+    async with session.head(url, timeout=timeout) as response:
+        if response.status not in (405, 501):
+            return response.status == 200
+
+    # HEAD not supported: only look at the GET status, the body is never read
+    async with session.get(url, timeout=timeout) as response:
+        return response.status == 200
+
+
+async def find_latest_smard_daily_dataset(session: aiohttp.ClientSession, start_timestamp: int, max_days_back: int = 14):
     """
     Try to find the latest SMARD dataset, starting from start_timestamp,
-    checking up to max_days_back days back.
+    checking up to max_days_back days back. All days are probed concurrently.
     """
     base_url = "https://www.smard.de/app/chart_data/410/DE/410_DE_hour_{}.json"
 
-    for i in range(max_days_back):
-        # Subtract i days from start_timestamp
-        timestamp_ms = start_timestamp - i * 24 * 60 * 60 * 1000
-        url = base_url.format(timestamp_ms)
+    # Subtract i days from start_timestamp
+    candidates = [start_timestamp - i * 24 * 60 * 60 * 1000 for i in range(max_days_back)]
+    results = await asyncio.gather(
+        *(smard_dataset_exists(session, base_url.format(timestamp_ms)) for timestamp_ms in candidates),
+        return_exceptions=True
+    )
 
-        response = requests.get(url)
-        if response.status_code == 200:
-            return timestamp_ms
+    valid = [timestamp_ms for timestamp_ms, exists in zip(candidates, results) if exists is True]
+    if valid:
+        return max(valid)
 
     print(f"No daily dataset found in the last {max_days_back} days.")
     return None
@@ -68,11 +88,12 @@ def generate_weekly_timestamps(start_timestamp: int) -> list[int]:
     return [int(dt.timestamp() * 1000) for dt in weeks]
 
 
-def get_smard_timeseries(filter: int, region: str, resolution: str, timestamp: int):
+async def get_smard_timeseries(session: aiohttp.ClientSession, filter: int, region: str, resolution: str, timestamp: int):
     """
     Fetch data from the SMARD API.
 
     Args:
+        session (aiohttp.ClientSession): Open session used for the request.
         filter (str): The filter parameter, e.g. '410' consumption
         region (str): The region parameter, e.g. 'DE'
         resolution (str): The resolution, e.g. 'hour', 'quarterhour', 'day'
@@ -86,15 +107,92 @@ def get_smard_timeseries(filter: int, region: str, resolution: str, timestamp: i
 
     url = f"https://www.smard.de/app/chart_data/{filter}/{region}/{filter}_{region}_{resolution}_{timestamp}.json"
 
+    cached = read_cache(url)
+    if cached is not None:
+        return cached
+
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json().get("series", [])
-    except requests.exceptions.RequestException as e:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            data = await response.json()
+        series = data.get("series", [])
+        # A non-empty week without missing values is complete and never needs to be downloaded again
+        write_cache(url, series, final=bool(series) and all(value is not None for _, value in series))
+        return series
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        # ValueError covers malformed JSON bodies, so only this week is skipped
         print(f"Error fetching data: {e}")
         return None
 
 
+async def download_smard_week(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, ts: int, folder_name: str):
+    """
+    Download price and demand for one week and write its CSV as soon as both have arrived.
+
+    Args:
+        session (aiohttp.ClientSession): Open session used for the requests.
+        semaphore (asyncio.Semaphore): Limits the number of downloads in flight.
+        ts (int): Weekly SMARD timestamp (ms).
+        folder_name (str): Folder to write the weekly CSV to.
+    """
+    async with semaphore:
+        prices = await get_smard_timeseries(session, filter=4169, region="DE", resolution="hour", timestamp=ts)
+        demands = await get_smard_timeseries(session, filter=410, region="DE", resolution="hour", timestamp=ts)
+
+    monday = datetime.fromtimestamp(ts / 1000.0)
+    file_name = os.path.join(folder_name,f"data_{monday.strftime('%Y_%m_%d')}.csv")
+    if prices is not None and demands is not None:
+        dataset = {
+            "price (MWh)": prices,
+            "demand (MW)": demands
+        }
+        # Write on a worker thread so the event loop keeps downloading the other weeks
+        await asyncio.to_thread(datasets_to_csv, dataset, file_name)
+    else:
+        print(f"Oops, something went wrong for {file_name}")
+
+
+async def download_smard_data(start_timestamp: int, folder_name: str, max_concurrency: int = 8) -> bool:
+    """
+    Find the latest SMARD dataset, then download and write every week concurrently.
+
+    Args:
+        start_timestamp (int): Timestamp (ms) to start probing from.
+        folder_name (str): Folder to write the weekly CSVs to.
+        max_concurrency (int): Maximum number of weeks downloading at once.
+
+    Returns:
+        bool: False if no valid dataset was found.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+        valid_timestamp = await find_latest_smard_daily_dataset(session, start_timestamp)
+        if not valid_timestamp:
+            return False
+
+        # Generate all weekly timestamps until this week
+        valid_timestamp_list = generate_weekly_timestamps(valid_timestamp)
+        await asyncio.gather(*(
+            download_smard_week(session, semaphore, ts, folder_name)
+            for ts in valid_timestamp_list
+        ))
+
+    return True
+
+
+def berlin_time_strings(timestamps: list[int]) -> list[str]:
+    """
+    Format millisecond timestamps as Berlin local time strings in one vectorized pass.
+    """
+    return (
+        pd.to_datetime(timestamps, unit="ms", utc=True)
+        .tz_convert("Europe/Berlin")
+        .strftime("%Y-%m-%d %H:%M:%S")
+        .tolist()
+    )
+
+
 def datasets_to_csv(datasets: dict[str, list[list]], csv_filename: str):
     """
     Combine multiple timestamped datasets into a single CSV.
@@ -104,30 +202,34 @@ def datasets_to_csv(datasets: dict[str, list[list]], csv_filename: str):
                   Values are lists of [timestamp, value].
         csv_filename: Output CSV file path.
     """
-    combined_dict = {}
+    column_names = list(datasets)
 
-    # Iterate over each dataset
-    for column_name, data in datasets.items():
+    # Align all datasets on their millisecond timestamps
+    merged = {}
+    for i, data in enumerate(datasets.values()):
         for ts, value in data:
-            if ts not in combined_dict:
-                combined_dict[ts] = {}
-            combined_dict[ts][column_name] = value
-
-    # Convert to DataFrame
-    df = pd.DataFrame.from_dict(combined_dict, orient='index')
-
-    # Convert index from milliseconds timestamp to Berlin datetime
-    berlin_tz = ZoneInfo("Europe/Berlin")
-    df.index = [datetime.fromtimestamp(ts / 1000, tz=berlin_tz).strftime("%Y-%m-%d %H:%M:%S") for ts in df.index]
-
-    # Name the index
-    df.index.name = 'time_berlin'
-
-    # Sort by time
-    df.sort_index(inplace=True)
-
-    # Export to CSV
-    df.to_csv(csv_filename, float_format='%.2f')
+            merged.setdefault(ts, [None] * len(column_names))[i] = value
+
+    timestamps = sorted(merged)
+    time_strings = berlin_time_strings(timestamps)
+
+    # Like pandas, a column keeps integer formatting only if every row holds an int
+    integer_columns = [
+        all(isinstance(row[i], int) for row in merged.values())
+        for i in range(len(column_names))
+    ]
+
+    # Export to CSV, writing missing values as empty fields
+    with open(csv_filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["time_berlin", *column_names])
+        writer.writerows(
+            [time_string, *(
+                "" if value is None else str(value) if is_integer else f"{value:.2f}"
+                for value, is_integer in zip(merged[ts], integer_columns)
+            )]
+            for ts, time_string in zip(timestamps, time_strings)
+        )
     print(f"CSV saved to {csv_filename}")
 
 def combine_csvs():
@@ -145,11 +247,15 @@ def combine_csvs():
     if not csv_files:
         raise FileNotFoundError(f"No CSV files found in {folder}")
 
-    # Read and stack them
-    df = pd.concat(
-        (pd.read_csv(f, parse_dates=["time_berlin"]) for f in csv_files),
-        ignore_index=True
-    )
+    # Read them on a thread pool (file I/O and parsing release the GIL) and stack them
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        df = pd.concat(
+            executor.map(pd.read_csv, csv_files),
+            ignore_index=True
+        )
+
+    # Parse all timestamps at once with their fixed format
+    df["time_berlin"] = pd.to_datetime(df["time_berlin"], format="%Y-%m-%d %H:%M:%S", cache=True)
 
     # Set datetime index, sort, and drop duplicates
     df = (
@@ -169,33 +275,14 @@ def run_pipeline(year: int, month: int, day: int):
     Generate a CSV file containing hourly electricity prices and demand.
     """
     timestamp = get_utc_timestamp_from_date(year=year, month=month, day=day)
-    valid_timestamp = find_latest_smard_daily_dataset(timestamp)
+    folder_name = "smard_data"
+    os.makedirs(folder_name, exist_ok=True)
 
-
-    if not valid_timestamp:
+    # Each week's CSV is written while the remaining weeks are still downloading
+    if not asyncio.run(download_smard_data(timestamp, folder_name)):
         print("No valid dataset found.")
         return
 
-    # Generate all weekly timestamps until this week
-    valid_timestamp_list = generate_weekly_timestamps(valid_timestamp)
-    # Loop through all weekly timestamps
-    for ts in valid_timestamp_list:
-        monday = datetime.fromtimestamp(ts / 1000.0)
-        prices = get_smard_timeseries(filter=4169, region="DE", resolution="hour", timestamp=ts)
-        demands = get_smard_timeseries(filter=410, region="DE", resolution="hour", timestamp=ts)
-
-        folder_name = "smard_data"
-        os.makedirs(folder_name, exist_ok=True)
-        file_name = os.path.join(folder_name,f"data_{monday.strftime('%Y_%m_%d')}.csv")
-        if prices is not None and demands is not None:
-            dataset = {
-                "price (MWh)": prices,
-                "demand (MW)": demands
-            }
-            datasets_to_csv(dataset, file_name)
-        else:
-            print(f"Oops, something went wrong for {file_name}")
-
     combine_csvs()
 
 
@@ -1,9 +1,34 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
-df = pd.read_csv(r"TrainingData\merged.csv", parse_dates=["time_berlin"])
-df = df.set_index("time_berlin").sort_index()
+TRAINING_DATA_FILE = r"TrainingData\merged.parquet"
+
+
+def ensure_c_order(df):
+    """
+    Make sure every column of a numeric DataFrame is contiguous in memory so
+    column-wise aggregations walk it with stride 1.
+
+    Frames that already satisfy this (e.g. straight from read_parquet) are
+    returned unchanged. Otherwise each column is copied into its own
+    contiguous float64 array, which pandas lays out column by column
+    regardless of its version.
+    """
+    if all(df[column].to_numpy().flags.c_contiguous for column in df.columns):
+        return df
+    return pd.DataFrame(
+        {column: np.ascontiguousarray(df[column].to_numpy(dtype=np.float64)) for column in df.columns},
+        index=df.index
+    )
+
+
+# Parquet keeps the time_berlin index and column dtypes, so nothing needs parsing
+df = pd.read_parquet(TRAINING_DATA_FILE)
+df = ensure_c_order(df.sort_index())
 df.head()
 
-df.plot(subplots=True, figsize=(12,8))
+# Plotting every hourly point is slow and indistinguishable at this size, so use daily means
+plot_df = df.resample("1D").mean() if len(df) > 5000 else df
+plot_df.plot(subplots=True, figsize=(12,8))
 plt.show()
\ No newline at end of file